@@ -0,0 +1,216 @@
+import csv
+import io
+import struct
+from psycopg2.extras import execute_values
+from config import DEBUG
+
+READ_BUFFER_SIZE = 1 << 20
+
+# COPY marker for NULL, so that unquoted empty CSV fields still load as ''
+COPY_NULL = '\\N'
+
+# CSV spellings of true; a set lookup avoids allocating an upper-cased copy per value
+_TRUTHY = frozenset({'TRUE', 'True', 'true', 'T', 't', '1'})
+
+def parse_bool(value):
+    """CSV booleans: TRUE/True/true/T/t/1 are True, anything else (including empty) is False."""
+    return value in _TRUTHY
+
+def or_empty(value):
+    """Load an empty or missing CSV value as '' instead of NULL."""
+    return value or ''
+
+def read_csv_file(file_path, columns):
+    """Yield CSV rows as tuples ordered like `columns`; empty or missing values become None."""
+    # Read in large binary chunks and decode once per chunk rather than per line
+    with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as raw, \
+            io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, [])
+
+        if DEBUG:
+            print('DEBUG: CSV fieldnames:', header)
+
+        # Map each wanted column to its position in the file once, not per row
+        positions = {name: i for i, name in enumerate(header)}
+        indices = [positions.get(c) for c in columns]
+        for row in reader:
+            values = []
+            for i in indices:
+                v = row[i] if i is not None and i < len(row) else None
+                values.append(v if v and not v.isspace() else None)
+            yield tuple(values)
+
+def _encode_bool(value):
+    return b'\x01' if (parse_bool(value) if isinstance(value, str) else value) else b'\x00'
+
+def _encode_text(value):
+    return str(value).encode('utf-8')
+
+# Binary COPY encoders by PostgreSQL type name; values arrive as CSV strings or coerced Python values
+BINARY_ENCODERS = {
+    'int2': lambda v: struct.pack('!h', int(v)),
+    'int4': lambda v: struct.pack('!i', int(v)),
+    'int8': lambda v: struct.pack('!q', int(v)),
+    'bool': _encode_bool,
+    'text': _encode_text,
+    'varchar': _encode_text,
+}
+
+BINARY_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+
+def column_types(conn, table, columns):
+    """Return the PostgreSQL type name of each column, in order."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.attname, t.typname
+            FROM pg_attribute a
+            JOIN pg_type t ON t.oid = a.atttypid
+            WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+        """, (table,))
+        types = dict(cur.fetchall())
+    return [types[c] for c in columns]
+
+class ChunkStream:
+    """Read-only file object over an iterator of str or bytes chunks, so COPY can pull rows lazily."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        # Chunk that a previous read() stopped inside, and where it stopped
+        self._partial = None
+        self._offset = 0
+
+    def read(self, size=-1):
+        # Collect whole chunks and join them once; a partly read chunk is kept with an
+        # offset rather than re-sliced, so each byte is copied a bounded number of times
+        parts = []
+        length = 0
+        if self._partial is not None:
+            partial, start = self._partial, self._offset
+            end = len(partial) if size < 0 else min(len(partial), start + size)
+            parts.append(partial[start:end])
+            length = end - start
+            if end < len(partial):
+                self._offset = end
+                return parts[0]
+            self._partial = None
+        if size < 0 or length < size:
+            for chunk in self._chunks:
+                parts.append(chunk)
+                length += len(chunk)
+                if 0 <= size <= length:
+                    break
+        if not parts:
+            return ''
+        excess = length - size if size >= 0 else 0
+        if excess > 0:
+            last = parts[-1]
+            cut = len(last) - excess
+            parts[-1] = last[:cut]
+            self._partial, self._offset = last, cut
+        if len(parts) == 1:
+            return parts[0]
+        return ('' if isinstance(parts[0], str) else b'').join(parts)
+
+def _binary_chunks(encoders, rows):
+    yield BINARY_COPY_HEADER
+    field_count = struct.pack('!h', len(encoders))
+    null_field = struct.pack('!i', -1)
+    for row in rows:
+        parts = [field_count]
+        for encode, value in zip(encoders, row):
+            if value is None:
+                parts.append(null_field)
+            else:
+                data = encode(value)
+                parts.append(struct.pack('!i', len(data)))
+                parts.append(data)
+        yield b''.join(parts)
+    yield struct.pack('!h', -1)
+
+def _csv_chunks(rows):
+    line = io.StringIO()
+    writer = csv.writer(line)
+    for row in rows:
+        writer.writerow([COPY_NULL if v is None else v for v in row])
+        yield line.getvalue()
+        line.seek(0)
+        line.truncate()
+
+def copy_rows(conn, table, columns, rows):
+    """
+    Stream rows into a table with a single COPY ... FROM STDIN.
+
+    Uses the binary COPY format when every column type has an encoder, so
+    the server skips text parsing of ints and booleans; otherwise CSV.
+    Rows are encoded as COPY reads them, so memory stays bounded for any
+    file size.
+    """
+    encoders = [BINARY_ENCODERS.get(t) for t in column_types(conn, table, columns)]
+    if all(encoders):
+        stream = ChunkStream(_binary_chunks(encoders, rows))
+        options = "FORMAT BINARY"
+    else:
+        stream = ChunkStream(_csv_chunks(rows))
+        options = f"FORMAT CSV, NULL '{COPY_NULL}'"
+
+    with conn.cursor() as cur:
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH ({options})", stream)
+
+def make_row_transform(columns, coercers):
+    """
+    Build the per-row coercion function once for a column layout.
+
+    Returns None when no column needs coercing, so rows pass through untouched.
+    """
+    coercions = tuple((i, coercers[c]) for i, c in enumerate(columns) if c in (coercers or {}))
+    if not coercions:
+        return None
+    if len(coercions) == 1:
+        (index, fn), = coercions
+
+        def transform(row):
+            return row[:index] + (fn(row[index]),) + row[index + 1:]
+        return transform
+
+    def transform(row):
+        row = list(row)
+        for i, fn in coercions:
+            row[i] = fn(row[i])
+        return row
+    return transform
+
+def bulk_load_csv(conn, table, csv_path, columns, coercers=None, on_conflict=None):
+    """
+    Load a CSV file into `table` and return the number of rows read.
+
+    `columns` lists the table columns to fill. An entry may be a
+    (table_column, csv_column) pair when the CSV header uses another name.
+    `coercers` maps a table column to a function applied to its raw value
+    (None when the CSV field is empty or missing). Rows are streamed with
+    COPY, or with execute_values when `on_conflict` is given, e.g.
+    on_conflict="(song_id) DO NOTHING".
+    """
+    pairs = [c if isinstance(c, tuple) else (c, c) for c in columns]
+    table_columns = [table_col for table_col, _ in pairs]
+    csv_columns = [csv_col for _, csv_col in pairs]
+    transform = make_row_transform(table_columns, coercers)
+
+    count = 0
+
+    def rows():
+        nonlocal count
+        for row in read_csv_file(csv_path, csv_columns):
+            count += 1
+            yield row if transform is None else transform(row)
+
+    if on_conflict is None:
+        copy_rows(conn, table, table_columns, rows())
+    else:
+        with conn.cursor() as cur:
+            execute_values(cur, f"""
+                INSERT INTO {table} ({', '.join(table_columns)})
+                VALUES %s
+                ON CONFLICT {on_conflict}
+            """, rows(), page_size=1000)
+    return count
@@ -0,0 +1,16 @@
+import psycopg2.pool
+from config import DATABASE_URL
+
+# Shared psycopg2 connection pool, created on first use
+_pool = None
+
+def get_connection():
+    """Check out a connection from the shared pool, creating the pool on first use."""
+    global _pool
+    if _pool is None:
+        _pool = psycopg2.pool.ThreadedConnectionPool(1, 10, dsn=DATABASE_URL)
+    return _pool.getconn()
+
+def release_connection(conn):
+    """Return a connection obtained from get_connection() to the pool."""
+    _pool.putconn(conn)
@@ -14,16 +14,27 @@
 # --------------------
 # Imports and Setup
 # --------------------
-from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi import FastAPI, HTTPException, Request, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-from sqlalchemy import text, insert, Table, Column, Integer, String, MetaData, Text, TIMESTAMP, create_engine
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from sqlalchemy import text, insert, Table, Column, Integer, String, MetaData, Text, TIMESTAMP, JSON
+from sqlalchemy.ext.asyncio import create_async_engine
 from typing import List, Dict
+import asyncio
 import json
 import os
-from pydantic import BaseModel
+import random
+import secrets
+import time
+from pydantic import BaseModel, Field
 import uvicorn
+import redis.asyncio as aioredis
+from cachetools import TTLCache
+from redis.exceptions import RedisError
 from pathlib import Path
 import logging
 import uuid
@@ -34,7 +45,7 @@ from datetime import datetime, timedelta
 logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO)
 logger = logging.getLogger(__name__)
 
-# SQLAlchemy metadata for table definitions (used for 'other_responses_18')
+# SQLAlchemy metadata for table definitions (used for 'other_responses_18' and 'checkbox_responses_18')
 metadata = MetaData()
 
 # Table definition for 'other_responses_18' (for free-text answers)
@@ -55,23 +66,440 @@ other_responses_table = Table(
 class Vote(BaseModel):
     question_id: str
     option_code: str
-    session_id: str = None  # Optional session ID
-    uuid: str = None  # User UUID
+    session_id: str = Field(None, max_length=36)  # Optional session ID
+    uuid: str = Field(None, max_length=36)  # User UUID
     year_of_birth: int = None  # User's year of birth
-    referred_by: str = None  # Referrer UUID
+    referred_by: str = Field(None, max_length=255)  # Referrer UUID (users_18.referred_by)
 
 class FollowUpRequest(BaseModel):
     session_id: str
     current_question_id: str
     answer: str
 
-# In-memory session data (for development; use Redis in production)
-session_responses = {}
+# --------------------
+# Session Store
+# --------------------
+SESSION_TTL_SECONDS = 3600
+
+class SessionStore:
+    """Answer history per session_id.
+
+    Kept in Redis (one list per session, expiring after an hour) when REDIS_URL
+    is set, so every worker sees the same history; otherwise falls back to an
+    in-process dict for local development.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.local = {}
+
+    async def append(self, session_id, response):
+        """Record a response and return the session's full history."""
+        if self.redis is None:
+            self.local.setdefault(session_id, []).append(response)
+            return self.local[session_id]
+        key = f"sess:{session_id}"
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, json.dumps(response))
+            pipe.expire(key, SESSION_TTL_SECONDS)
+            pipe.lrange(key, 0, -1)
+            _, _, items = await pipe.execute()
+        return [json.loads(item) for item in items]
+
+    async def get(self, session_id):
+        if self.redis is None:
+            return self.local.get(session_id, [])
+        return [json.loads(item) for item in await self.redis.lrange(f"sess:{session_id}", 0, -1)]
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+
+# --------------------
+# Response Cache
+# --------------------
+# Categories and questions are editorial content that only changes on re-import
+CATEGORIES_CACHE_KEY = "cats:v1"
+CATEGORIES_CACHE_TTL = 3600
+QUESTIONS_CACHE_TTL = 600
+
+# question_ids of the start questions, refreshed per worker every QUESTIONS_CACHE_TTL seconds
+_start_question_ids = {"ids": [], "expires_at": 0.0}
+
+async def get_start_question_ids(conn):
+    if time.monotonic() >= _start_question_ids["expires_at"]:
+        result = await conn.execute(SQL_START_QUESTION_IDS)
+        _start_question_ids["ids"] = list(result.scalars())
+        _start_question_ids["expires_at"] = time.monotonic() + QUESTIONS_CACHE_TTL
+    return _start_question_ids["ids"]
+
+# Questions with their options, keyed by question_id. Bounded LRU per worker; the TTL
+# lets every worker pick up content edits, /api/admin/cache/clear drops them at once.
+_question_cache = TTLCache(maxsize=1024, ttl=QUESTIONS_CACHE_TTL)
+
+def build_question(rows):
+    """Shape question+option rows (one per option) into the start/next question payload."""
+    question = rows[0]
+    return {
+        "id": question['id'],
+        "question_id": question['question_id'],
+        "text": question['question_text'],
+        "category": question['category_name'],
+        "category_id": str(question['category_id']),
+        "color_code": question['color_code'],
+        "options_18": [{
+            "id": opt['option_id'],
+            "text": opt['option_text'],
+            "code": opt['option_code'],
+            "response_message": opt['response_message'],
+            "companion_advice": opt['companion_advice'],
+            "next_question_id": opt['next_question_id']
+        } for opt in rows if opt['option_id'] is not None]
+    }
+
+async def get_question(conn, question_id):
+    """Question payload for question_id from the in-process cache, loading it on a miss (None if unknown)."""
+    question = _question_cache.get(question_id)
+    if question is None:
+        rows = (await conn.execute(SQL_QUESTION_WITH_OPTIONS, {"question_id": question_id})).mappings().all()
+        if not rows:
+            return None
+        question = _question_cache[question_id] = build_question(rows)
+    return question
+
+# Block listings per category_id, cached the same way
+_blocks_cache = TTLCache(maxsize=512, ttl=QUESTIONS_CACHE_TTL)
+
+async def get_blocks(conn, category_id):
+    """Blocks of a category from blocks_18, else derived from questions_18 (empty list if none)."""
+    blocks = _blocks_cache.get(category_id)
+    if blocks is None:
+        result = await conn.execute(SQL_CATEGORY_BLOCKS, {"category_id": category_id})
+        blocks = [dict(row) for row in result.mappings().all()]
+        if not blocks:
+            # Fallback: if no blocks_18 in blocks_18 table, get FROM questions_18 table
+            result = await conn.execute(SQL_CATEGORY_BLOCKS_FROM_QUESTIONS, {"category_id": category_id})
+            blocks = [dict(row) for row in result.mappings().all()]
+        if blocks:
+            _blocks_cache[category_id] = blocks
+    return blocks
+
+async def cached(redis_client, key, ttl, fetch):
+    """
+    Read-through cache for JSON endpoints.
+
+    fetch() returns the response body already serialized (Postgres builds it
+    with json_agg), or None when there is nothing to return, which is served
+    as an uncached []. Hits are served straight from Redis; Redis being unset
+    or unreachable just means every call goes to fetch().
+    """
+    if redis_client is not None:
+        try:
+            body = await redis_client.get(key)
+            if body is not None:
+                return Response(content=body, media_type="application/json")
+        except RedisError as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+    body = await fetch()
+    if body is None:
+        body = "[]"
+    elif redis_client is not None:
+        try:
+            await redis_client.set(key, body, ex=ttl)
+        except RedisError as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+    return Response(content=body, media_type="application/json")
+
+# --------------------
+# SQL Statements
+# --------------------
+# Hot-path statements are built once at import; SQLAlchemy caches their compiled
+# form and asyncpg keeps a prepared statement per connection for each of them.
+# The cooldowns are fixed config values, so baking them in keeps the SQL constant.
+# The categories list exactly as /api/categories returns it, as JSON text (NULL when empty)
+SQL_CATEGORIES = text("""
+    SELECT json_agg(json_build_object(
+        'id', id::text,
+        'category_name', category_name,
+        'category_text', category_text,
+        'category_text_long', category_text_long
+    ) ORDER BY id)::text
+    FROM categories_18
+""")
+
+SQL_RECENT_VOTE = text(f"""
+    SELECT 1 FROM responses_18
+    WHERE uuid = :uuid
+      AND question_id = :qid
+      AND created_at > NOW() - INTERVAL '{QUESTION_COOLDOWN}'
+    LIMIT 1
+""")
+
+# SQL_CREATE_USER as a CTE for the vote statements: runs only when :create_user is set and
+# the vote isn't blocked by the cooldown (blocked_sql)
+def _create_user_cte(blocked_sql):
+    return f"""
+    created AS (
+        INSERT INTO users_18 (uuid, year_of_birth, referred_by)
+        SELECT CAST(:uuid AS VARCHAR), CAST(:year_of_birth AS INTEGER),
+               (SELECT uuid FROM users_18 WHERE uuid = :referred_by)
+        WHERE CAST(:create_user AS BOOLEAN) AND NOT ({blocked_sql})
+        ON CONFLICT (uuid) DO NOTHING
+        RETURNING referred_by
+    )"""
+
+# Checkbox vote cooldown check plus, unless blocked, the SQL_CREATE_USER upsert in one round trip
+SQL_CHECKBOX_VOTE_PRECHECK = text(f"""
+    WITH recent AS (
+        SELECT EXISTS (
+            SELECT 1 FROM checkbox_responses_18
+            WHERE uuid = :uuid
+              AND question_id = :qid
+              AND created_at > NOW() - INTERVAL '{QUESTION_COOLDOWN}'
+        ) AS blocked
+    ),{_create_user_cte("SELECT blocked FROM recent")}
+    SELECT (SELECT blocked FROM recent) AS blocked,
+           EXISTS (SELECT 1 FROM created) AS user_created,
+           (SELECT referred_by FROM created) AS referred_by
+""")
+
+# Check the cooldown, create the user, resolve the option and insert the vote in one statement
+SQL_RECORD_VOTE = text(f"""
+    WITH recent AS (
+        SELECT 1 FROM responses_18
+        WHERE uuid = :uuid
+          AND question_id = :qid
+          AND created_at > NOW() - INTERVAL '{QUESTION_COOLDOWN}'
+        LIMIT 1
+    ),{_create_user_cte("EXISTS (SELECT 1 FROM recent)")}, inserted AS (
+        INSERT INTO responses_18 (question_id, option_id, uuid, option_code)
+        SELECT o.question_id, o.id, CAST(:uuid AS VARCHAR), CAST(:stored_option_code AS VARCHAR)
+        FROM options_18 o
+        WHERE o.question_id = :qid AND o.option_code = :option_code
+          AND NOT EXISTS (SELECT 1 FROM recent)
+        LIMIT 1
+        RETURNING id
+    )
+    SELECT EXISTS (SELECT 1 FROM recent) AS already_voted,
+           (SELECT id FROM inserted) AS response_id,
+           EXISTS (SELECT 1 FROM created) AS user_created,
+           (SELECT referred_by FROM created) AS referred_by
+""")
+
+# Serializes concurrent votes by one user on one question until commit, so the cooldown
+# check in the next statement sees a vote committed by the other request
+SQL_LOCK_VOTER_QUESTION = text("SELECT pg_advisory_xact_lock(hashtext(:uuid), hashtext(:qid))")
+
+SQL_QUESTION_WITH_OPTIONS = text("""
+    SELECT q.id, q.question_id, q.question_text, q.category_id, q.color_code, c.category_name,
+           o.id AS option_id, o.option_text, o.option_code,
+           o.response_message, o.companion_advice, o.next_question_id
+    FROM questions_18 q
+    LEFT JOIN categories_18 c ON q.category_id = c.id
+    LEFT JOIN options_18 o ON o.question_id = q.question_id
+    WHERE q.question_id = :question_id
+    ORDER BY o.option_code
+""")
+
+SQL_CATEGORY_BLOCKS = text("""
+    SELECT id, category_id, block_number, block_text, version, uuid
+    FROM blocks_18
+    WHERE category_id = :category_id
+    ORDER BY block_number
+""")
+
+SQL_CATEGORY_BLOCKS_FROM_QUESTIONS = text("""
+    SELECT DISTINCT block as block_number,
+           'Block ' || block as block_text,
+           CAST(:category_id AS INTEGER) as category_id
+    FROM questions_18
+    WHERE category_id = :category_id AND block IS NOT NULL
+    ORDER BY block
+""")
+
+# First block of a category the user hasn't completed within BLOCK_COOLDOWN
+SQL_NEXT_BLOCK = text(f"""
+    SELECT
+        EXISTS (
+            SELECT 1 FROM questions_18 WHERE category_id = :category_id AND block IS NOT NULL
+        ) AS has_blocks,
+        (
+            SELECT q.block
+            FROM (
+                SELECT DISTINCT block FROM questions_18
+                WHERE category_id = :category_id AND block IS NOT NULL
+            ) q
+            LEFT JOIN user_block_progress_18 p
+              ON p.block = q.block
+             AND p.category_id = :category_id
+             AND p.uuid = :uuid
+             AND p.completed_at > NOW() - INTERVAL '{BLOCK_COOLDOWN}'
+            WHERE p.block IS NULL
+            ORDER BY q.block
+            LIMIT 1
+        ) AS block
+""")
+
+# Question list built as one JSON text value by Postgres, options included. Precompiled for
+# each combination of the optional category and block filters: SQL_QUESTIONS[by_category, by_block]
+_SQL_QUESTIONS_BASE = """
+    SELECT json_agg(json_build_object(
+        'id', q.id,
+        'question_id', q.question_id,
+        'text', q.question_text,
+        'category', c.category_name,
+        'category_id', q.category_id::text,
+        'color_code', q.color_code,
+        'check_box', q.check_box,
+        'block', CAST(:block AS INTEGER),
+        'options_18', COALESCE((
+            SELECT json_agg(json_build_object(
+                'id', o.id,
+                'text', o.option_text,
+                'code', o.option_code,
+                'response_message', o.response_message,
+                'companion_advice', o.companion_advice
+            ) ORDER BY o.option_code)
+            FROM options_18 o
+            WHERE o.question_id = q.question_id
+        ), '[]')
+    ) ORDER BY q.question_number, q.id)::text
+    FROM questions_18 q
+    JOIN categories_18 c ON q.category_id = c.id
+"""
+
+def _questions_statement(by_category, by_block):
+    where = []
+    if by_category:
+        where.append("q.category_id = :category_id")
+    if by_block:
+        # Use blocks_18 table to filter by block_number
+        where.append("EXISTS (SELECT 1 FROM blocks_18 b WHERE b.category_id = q.category_id AND b.block_number = :block)")
+    return text(_SQL_QUESTIONS_BASE + (" WHERE " + " AND ".join(where) if where else ""))
+
+SQL_QUESTIONS = {
+    (by_category, by_block): _questions_statement(by_category, by_block)
+    for by_category in (False, True) for by_block in (False, True)
+}
+
+SQL_START_QUESTION_IDS = text("SELECT question_id FROM questions_18 WHERE is_start_question = TRUE")
+
+# A category's start question joined with its options, one row per option
+SQL_CATEGORY_START_QUESTION = text("""
+    WITH q AS (
+        SELECT q.id, q.question_id, q.question_text, q.category_id, q.color_code, c.category_name
+        FROM questions_18 q
+        LEFT JOIN categories_18 c ON q.category_id = c.id
+        WHERE q.category_id = :category_id AND q.is_start_question = TRUE
+        LIMIT 1
+    )
+    SELECT q.*, o.id AS option_id, o.option_text, o.option_code,
+           o.response_message, o.companion_advice, o.next_question_id
+    FROM q
+    LEFT JOIN options_18 o ON o.question_id = q.question_id
+    ORDER BY o.option_code
+""")
+
+SQL_CATEGORY_COUNT = text("SELECT COUNT(*) FROM categories_18")
+
+# Checkbox answers with their option ids looked up server-side, for a question not in _question_cache.
+# One row per code (its lowest option id), in the order of :option_codes, as the cached path stores them
+SQL_RECORD_CHECKBOX_VOTE = text("""
+    INSERT INTO checkbox_responses_18 (question_id, option_id, uuid, option_code)
+    SELECT o.question_id, o.id, CAST(:uuid AS VARCHAR), o.option_code
+    FROM (
+        SELECT DISTINCT ON (option_code) question_id, id, option_code
+        FROM options_18
+        WHERE question_id = :question_id AND option_code = ANY(CAST(:option_codes AS VARCHAR[]))
+        ORDER BY option_code, id
+    ) o
+    ORDER BY array_position(CAST(:option_codes AS VARCHAR[]), o.option_code)
+""")
+
+# Checkbox answers whose option ids are already known, as one multi-row INSERT over unnested arrays
+SQL_RECORD_CHECKBOX_OPTIONS = text("""
+    INSERT INTO checkbox_responses_18 (question_id, option_id, uuid, option_code)
+    SELECT CAST(:question_id AS VARCHAR), o.option_id, CAST(:uuid AS VARCHAR), o.option_code
+    FROM unnest(CAST(:option_ids AS INTEGER[]), CAST(:option_codes AS VARCHAR[])) AS o (option_id, option_code)
+""")
+
+# Create a user on first submission; an unknown referrer is stored as NULL
+SQL_CREATE_USER = text("""
+    INSERT INTO users_18 (uuid, year_of_birth, referred_by)
+    VALUES (:uuid, :year_of_birth, (SELECT uuid FROM users_18 WHERE uuid = :referred_by))
+    ON CONFLICT (uuid) DO NOTHING
+    RETURNING referred_by
+""")
+
+SQL_MARK_BLOCK_COMPLETED_IF_ANSWERED = text("""
+    INSERT INTO user_block_progress_18 (uuid, category_id, block, completed_at)
+    SELECT CAST(:uuid AS VARCHAR), q.category_id, q.block, NOW()
+    FROM questions_18 q
+    WHERE q.question_id = :question_id
+      AND q.block IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM questions_18 bq
+          WHERE bq.category_id = q.category_id
+            AND bq.block = q.block
+            AND CASE WHEN bq.check_box THEN
+                    NOT EXISTS (SELECT 1 FROM checkbox_responses_18 c WHERE c.uuid = :uuid AND c.question_id = bq.question_id)
+                ELSE
+                    NOT EXISTS (SELECT 1 FROM responses_18 r WHERE r.uuid = :uuid AND r.question_id = bq.question_id)
+                END
+      )
+    ON CONFLICT (uuid, category_id, block) DO UPDATE SET completed_at = NOW()
+""")
+
+# Everything get_question_results needs, as a single JSON object
+SQL_QUESTION_RESULTS = text("""
+    WITH qinfo AS (
+        SELECT COALESCE(bool_or(check_box), FALSE) AS is_checkbox
+        FROM questions_18
+        WHERE question_id = :question_id
+    ), counts AS (
+        -- Single-choice questions: one vote per response
+        SELECT option_code, COUNT(*)::float8 AS count
+        FROM responses_18
+        WHERE question_id = :question_id AND NOT (SELECT is_checkbox FROM qinfo)
+        GROUP BY option_code
+        UNION ALL
+        -- Checkbox questions: each voter's vote is split across their selections
+        SELECT option_code, SUM(1.0 / cnt)::float8
+        FROM (
+            SELECT option_code, COUNT(*) OVER (PARTITION BY uuid) AS cnt
+            FROM checkbox_responses_18
+            WHERE question_id = :question_id AND uuid IS NOT NULL AND uuid <> ''
+              AND option_code IS NOT NULL AND (SELECT is_checkbox FROM qinfo)
+        ) t
+        GROUP BY option_code
+        UNION ALL
+        -- Anonymous checkbox votes count once per selection
+        SELECT option_code, COUNT(*)::float8
+        FROM checkbox_responses_18
+        WHERE question_id = :question_id AND (uuid IS NULL OR uuid = '')
+          AND (SELECT is_checkbox FROM qinfo)
+        GROUP BY option_code
+    )
+    SELECT json_build_object(
+        'check_box', (SELECT is_checkbox FROM qinfo),
+        'options', (
+            SELECT json_agg(o ORDER BY o.option_code)
+            FROM (SELECT id, option_text, option_code FROM options_18 WHERE question_id = :question_id) o
+        ),
+        'counts', (SELECT json_agg(counts) FROM counts),
+        'other', (
+            SELECT json_agg(other_text ORDER BY submitted_at DESC)
+            FROM other_responses_18
+            WHERE question_id = :question_id
+        )
+    ) AS payload
+""").columns(payload=JSON)
 
 # --------------------
 # FastAPI App Instance
 # --------------------
-app = FastAPI()
+# orjson serializes response payloads in C, much faster than the stdlib json encoder
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # --------------------
 # Migration Functions
@@ -113,6 +541,13 @@ def run_migrations(engine):
         logger.error(f"Error running migrations: {e}")
         # Don't raise the exception - let the app start even if migrations fail
 
+def async_database_url(url):
+    """Point a postgres:// or postgresql:// URL at the asyncpg driver."""
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
 # --------------------
 # Startup/Shutdown Events
 # --------------------
@@ -127,8 +562,27 @@ def startup_event():
     # Debug: Log the database URL being used
     logger.info(f"Starting up with DATABASE_URL: {database_url}")
     
-    # Create the database engine
-    app.state.engine = create_engine(database_url)
+    # Create the async database engine (asyncpg driver) so queries don't block the event loop.
+    # Each gunicorn worker gets its own pool, so split the connection budget across
+    # WEB_CONCURRENCY workers to stay under Postgres max_connections.
+    workers = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+    app.state.engine = create_async_engine(
+        async_database_url(database_url),
+        pool_size=max(2, DB_POOL_SIZE // workers),
+        max_overflow=max(1, DB_MAX_OVERFLOW // workers),
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+        # Keep more server-side prepared statements per connection than the defaults (100)
+        connect_args={"prepared_statement_cache_size": 512, "statement_cache_size": 512},
+    )
+    
+    # Redis for session history and response caching (optional)
+    app.state.redis = aioredis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+    app.state.sessions = SessionStore(app.state.redis)
+    
+    # uvicorn picks uvloop/httptools automatically when they're installed
+    logger.info(f"Event loop: {type(asyncio.get_event_loop()).__name__}")
     
     # Run migrations - DISABLED TO PREVENT DATA LOSS
     try:
@@ -149,16 +603,61 @@ def startup_event():
             logger.info(f"  {route}")
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     # Dispose of the database engine on shutdown
     if hasattr(app.state, 'engine'):
-        app.state.engine.dispose()
+        await app.state.engine.dispose()
+    if hasattr(app.state, 'sessions'):
+        await app.state.sessions.close()
 
 # --------------------
 # CORS Middleware
 # --------------------
+class FastCORS:
+    """
+    CORS middleware with a fast path for the common case: a non-preflight
+    request from an allowed origin is matched with a set lookup and gets the
+    same headers CORSMiddleware would add. Preflights, unknown origins and
+    everything else are handed to a wrapped CORSMiddleware.
+    """
+
+    def __init__(self, app, allow_origins, **cors_options):
+        self.app = app
+        self.cors = CORSMiddleware(app, allow_origins=allow_origins, **cors_options)
+        self.origins = frozenset(origin.encode("latin-1") for origin in allow_origins)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+                break
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] == "OPTIONS" or origin not in self.origins:
+            await self.cors(scope, receive, send)
+            return
+
+        origin = origin.decode("latin-1")
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                headers = MutableHeaders(scope=message)
+                headers.update(self.cors.simple_headers)
+                headers["Access-Control-Allow-Origin"] = origin
+                headers.add_vary_header("Origin")
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
 app.add_middleware(
-    CORSMiddleware,
+    FastCORS,
     allow_origins=[
         "https://www.myworldmysay.com",
         "https://myworldmysay.com",
@@ -172,143 +671,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --------------------
+# Response Compression
+# --------------------
+# Question lists and results can run to several KB of JSON; small responses aren't worth compressing
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # --------------------
 # API Endpoints
 # --------------------
+# Query helpers behind the cached read endpoints
+async def fetch_categories(engine):
+    async with engine.connect() as conn:
+        return (await conn.execute(SQL_CATEGORIES)).scalar()
+
 # Get all categories_18
 @app.get("/api/categories")
 async def get_categories(request: Request):
     try:
-        # Debug: Log the database URL being used
-        logger.info(f"Database URL: {DATABASE_URL}")
-        
-        with request.app.state.engine.connect() as conn:
-            # Debug: Check if categories_18 table exists
-            table_check = conn.execute(text("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'categories_18')"))
-            table_exists = table_check.scalar()
-            logger.info(f"Categories table exists: {table_exists}")
-            
-            if not table_exists:
-                logger.error("Categories table does not exist!")
-                return []
-            
-            # Debug: Check table schema
-            schema_result = conn.execute(text("""
-                SELECT column_name, data_type 
-                FROM information_schema.columns 
-                WHERE table_name = 'categories_18' 
-                ORDER BY ordinal_position
-            """))
-            schema = schema_result.mappings().all()
-            logger.info(f"Categories table schema: {[col['column_name'] for col in schema]}")
-            
-            # Debug: Check if there are any rows at all
-            any_rows = conn.execute(text("SELECT COUNT(*) FROM categories_18"))
-            total_rows = any_rows.scalar()
-            logger.info(f"Total rows in categories_18 table: {total_rows}")
-            
-            # Debug: Check transaction isolation and session info
-            session_info = conn.execute(text("""
-                SELECT 
-                    current_database() as db_name,
-                    current_user as user,
-                    inet_server_addr() as server_ip,
-                    txid_current() as transaction_id
-            """))
-            session_data = session_info.mappings().first()
-            logger.info(f"Session info: {session_data}")
-            
-            # Debug: Check first few rows with all columns
-            if total_rows > 0:
-                sample_data = conn.execute(text("SELECT * FROM categories_18 LIMIT 3"))
-                sample_rows = sample_data.mappings().all()
-                logger.info(f"Sample data FROM categories_18: {sample_rows}")
-            else:
-                logger.info("No rows found in categories_18 table")
-            
-            # Debug: Test the connection and count categories_18
-            count_result = conn.execute(text("SELECT COUNT(*) FROM categories_18"))
-            count = count_result.scalar()
-            logger.info(f"Found {count} categories_18 in database")
-            
-            # Debug: Show first few categories_18
-            sample_result = conn.execute(text("SELECT id, category_name FROM categories_18 LIMIT 3"))
-            sample_categories = sample_result.mappings().all()
-            logger.info(f"Sample categories_18: {sample_categories}")
-            
-            result = conn.execute(text("""
-                SELECT id, category_name, category_text, category_text_long
-                FROM categories_18
-                ORDER BY id
-            """))
-            categories_18 = result.mappings().all()
-            logger.info(f"Returning {len(categories_18)} categories_18")
-            return [{"id": str(cat["id"]), "category_name": cat["category_name"], "category_text": cat["category_text"], "category_text_long": cat["category_text_long"]} for cat in categories_18]
+        return await cached(
+            request.app.state.redis, CATEGORIES_CACHE_KEY, CATEGORIES_CACHE_TTL,
+            lambda: fetch_categories(request.app.state.engine),
+        )
     except Exception as e:
         logger.error(f"Error fetching categories_18: {str(e)}")
         return []
 
+async def fetch_questions(engine, category_id, block):
+    async with engine.connect() as conn:
+        # block is echoed back in every question, so it is always bound
+        params = {"block": block}
+        by_category = category_id is not None and category_id != "all"
+        if by_category:
+            params["category_id"] = int(category_id)
+        query = SQL_QUESTIONS[by_category, block is not None]
+        body = (await conn.execute(query, params)).scalar()
+        if body is None:
+            logger.error("No questions_18 found in database")
+            raise HTTPException(status_code=404, detail="No questions_18 found")
+        return body
+
 # Get all questions_18 (optionally filter by category and block)
 @app.get("/api/questions")
 async def get_questions(request: Request, category_id: str = Query(None), block: int = Query(None)):
     try:
-        with request.app.state.engine.connect() as conn:
-            # Updated query to use blocks_18 table instead of questions_18.block column
-            query = """
-                SELECT q.id, q.question_id, q.question_text, q.category_id, q.color_code, q.check_box, c.category_name
-                FROM questions_18 q
-                JOIN categories_18 c ON q.category_id = c.id
-            """
-            params = {}
-            where_clauses = []
-            if category_id is not None and category_id != "all":
-                where_clauses.append("q.category_id = :category_id")
-                params["category_id"] = int(category_id)
-            if block is not None:
-                # Use blocks_18 table to filter by block_number
-                where_clauses.append("""
-                    EXISTS (
-                        SELECT 1 FROM blocks_18 b 
-                        WHERE b.category_id = q.category_id 
-                        AND b.block_number = :block
-                    )
-                """)
-                params["block"] = int(block)
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
-            query += " ORDER BY q.question_number"
-            result = conn.execute(text(query), params)
-            questions_18 = result.mappings().all()
-            if not questions_18:
-                logger.error("No questions_18 found in database")
-                raise HTTPException(status_code=404, detail="No questions_18 found")
-            out = []
-            for question in questions_18:
-                options_result = conn.execute(text("""
-                    SELECT id, option_text, option_code, response_message, companion_advice
-                    FROM options_18
-                    WHERE question_id = :question_id
-                    ORDER BY option_code
-                """), {"question_id": question['question_id']})
-                options_18 = options_result.mappings().all()
-                out.append({
-                    "id": question['id'],
-                    "question_id": question['question_id'],
-                    "text": question['question_text'],
-                    "category": question['category_name'],
-                    "category_id": str(question['category_id']),
-                    "color_code": question['color_code'],
-                    "check_box": question['check_box'],
-                    "block": block,  # Use the requested block parameter
-                    "options_18": [{
-                        "id": opt['id'],
-                        "text": opt['option_text'],
-                        "code": opt['option_code'],
-                        "response_message": opt['response_message'],
-                        "companion_advice": opt['companion_advice']
-                    } for opt in options_18]
-                })
-            return out
+        return await cached(
+            request.app.state.redis, f"qs:{category_id}:{block}", QUESTIONS_CACHE_TTL,
+            lambda: fetch_questions(request.app.state.engine, category_id, block),
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -318,71 +728,49 @@ async def get_questions(request: Request, category_id: str = Query(None), block:
 @app.post("/api/vote")
 async def submit_vote(vote: Vote, request: Request):
     try:
-        with request.app.state.engine.begin() as conn:
-            # Check for recent vote (configurable cooldown)
-            result = conn.execute(
-                text(f"""
-                    SELECT * FROM responses_18
-                    WHERE uuid = :uuid
-                      AND question_id = :qid
-                      AND created_at > NOW() - INTERVAL '{QUESTION_COOLDOWN}'
-                """),
-                {"uuid": vote.uuid, "qid": vote.question_id}
-            ).fetchone()
-            if result:
+        async with request.app.state.engine.begin() as conn:
+            voter_uuid = vote.uuid or None
+            if vote.option_code == "OTHER":
+                # OTHER answers are stored later via /api/other-response; only the cooldown applies here
+                already_voted = (await conn.execute(
+                    SQL_RECENT_VOTE, {"uuid": voter_uuid, "qid": vote.question_id}
+                )).first() is not None
+                response_id = None
+                # Handle user creation/validation if UUID is provided
+                if not already_voted and vote.uuid and vote.year_of_birth:
+                    await ensure_user(conn, vote.uuid, vote.year_of_birth, vote.referred_by)
+            else:
+                if voter_uuid:
+                    await conn.execute(SQL_LOCK_VOTER_QUESTION, {"uuid": voter_uuid, "qid": vote.question_id})
+                # Check the cooldown, create the user if UUID and year of birth are provided,
+                # then resolve the option and record the vote, all in one statement.
+                # Anonymous votes are stored without uuid/option_code, as before.
+                vote_result = (await conn.execute(
+                    SQL_RECORD_VOTE,
+                    {
+                        "uuid": voter_uuid,
+                        "qid": vote.question_id,
+                        "option_code": vote.option_code,
+                        "stored_option_code": vote.option_code if voter_uuid else None,
+                        "year_of_birth": vote.year_of_birth,
+                        "referred_by": vote.referred_by,
+                        "create_user": bool(vote.uuid and vote.year_of_birth)
+                    }
+                )).mappings().first()
+                already_voted = vote_result['already_voted']
+                response_id = vote_result['response_id']
+                if vote_result['user_created']:
+                    logger.info(f"Created new user with UUID: {vote.uuid} (referred by: {vote_result['referred_by']})")
+            if already_voted:
                 return {
                     "status": "already_voted",
                     "message": f"You have already voted on this question. Please come back after {QUESTION_COOLDOWN} if you want to vote again for this question."
                 }
-            # Handle user creation/validation if UUID is provided
-            if vote.uuid and vote.year_of_birth:
-                # Check if user exists, create if not
-                user_result = conn.execute(text("""
-                    SELECT uuid FROM users_18 WHERE uuid = :uuid
-                """), {"uuid": vote.uuid})
-                user = user_result.mappings().first()
-                
-                if not user:
-                    # Create new user with referral info if provided
-                    if vote.referred_by:
-                        # Verify the referrer exists
-                        referrer_result = conn.execute(text("""
-                            SELECT uuid FROM users_18 WHERE uuid = :referrer_uuid
-                        """), {"referrer_uuid": vote.referred_by})
-                        referrer = referrer_result.mappings().first()
-                        
-                        if referrer:
-                            conn.execute(text("""
-                                INSERT INTO users_18 (uuid, year_of_birth, referred_by)
-                                VALUES (:uuid, :year_of_birth, :referred_by)
-                            """), {
-                                "uuid": vote.uuid, 
-                                "year_of_birth": vote.year_of_birth,
-                                "referred_by": vote.referred_by
-                            })
-                            logger.info(f"Created new user with UUID: {vote.uuid} referred by: {vote.referred_by}")
-                        else:
-                            # Referrer doesn't exist, create user without referral
-                            conn.execute(text("""
-                                INSERT INTO users_18 (uuid, year_of_birth)
-                                VALUES (:uuid, :year_of_birth)
-                            """), {"uuid": vote.uuid, "year_of_birth": vote.year_of_birth})
-                            logger.info(f"Created new user with UUID: {vote.uuid} (invalid referrer: {vote.referred_by})")
-                    else:
-                        # Create new user without referral
-                        conn.execute(text("""
-                            INSERT INTO users_18 (uuid, year_of_birth)
-                            VALUES (:uuid, :year_of_birth)
-                        """), {"uuid": vote.uuid, "year_of_birth": vote.year_of_birth})
-                        logger.info(f"Created new user with UUID: {vote.uuid}")
-            
             # Generate or use existing session ID
             if not vote.session_id:
                 vote.session_id = str(uuid.uuid4())
             # Store response in session history
-            if vote.session_id not in session_responses:
-                session_responses[vote.session_id] = []
-            session_responses[vote.session_id].append({
+            previous_responses = await request.app.state.sessions.append(vote.session_id, {
                 'question_id': vote.question_id,
                 'option_code': vote.option_code
             })
@@ -392,135 +780,52 @@ async def submit_vote(vote: Vote, request: Request):
                 return {
                     "status": "other_needed",
                     "session_id": vote.session_id,
-                    "previous_responses": session_responses[vote.session_id]
+                    "previous_responses": previous_responses
                 }
             
-            # First get the option_id for the given question_id and option_code
-            option_result = conn.execute(text("""
-                SELECT id FROM options_18 
-                WHERE question_id = :question_id AND option_code = :option_code
-            """), {"question_id": vote.question_id, "option_code": vote.option_code})
-            option = option_result.mappings().first()
-            if not option:
+            if response_id is None:
                 raise HTTPException(status_code=400, detail="Invalid option")
-            # Get client IP
-            client_ip = request.client.host
-            # Record the vote in responses_18 table with UUID if provided
-            if vote.uuid:
-                conn.execute(text("""
-                    INSERT INTO responses_18 (question_id, option_id, uuid, option_code)
-                    VALUES (:question_id, :option_id, :uuid, :option_code)
-                """), {
-                    "question_id": vote.question_id,
-                    "option_id": option['id'],
-                    "uuid": vote.uuid,
-                    "option_code": vote.option_code
-                })
-            else:
-                conn.execute(text("""
-                    INSERT INTO responses_18 (question_id, option_id)
-                    VALUES (:question_id, :option_id)
-                """), {"question_id": vote.question_id, "option_id": option['id']})
             
-            # After recording the vote, check if all questions_18 in the block are answered
-            # Get category_id and block for this question
-            qinfo = conn.execute(text("""
-                SELECT category_id, block FROM questions_18 WHERE question_id = :qid
-            """), {"qid": vote.question_id}).mappings().first()
-            if vote.uuid and qinfo and qinfo['block'] is not None:
-                if all_block_questions_answered(conn, vote.uuid, qinfo['category_id'], qinfo['block']):
-                    await mark_block_completed(conn, vote.uuid, qinfo['category_id'], qinfo['block'])
+            # After recording the vote, mark the block complete if all its questions_18 are answered
+            if vote.uuid:
+                await mark_block_completed_if_answered(conn, vote.uuid, vote.question_id)
             
             return {
                 "status": "success",
                 "session_id": vote.session_id,
-                "previous_responses": session_responses[vote.session_id]
+                "previous_responses": previous_responses
             }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error submitting vote: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/questions/{question_id}/results")
 async def get_question_results(question_id: str, request: Request):
-    print(f"DEBUG: Getting results for question_id: {question_id}")
-    logger.debug(f"Getting results for question_id: {question_id}")
+    logger.debug("Getting results for question_id: %s", question_id)
     try:
-        with request.app.state.engine.connect() as conn:
-            # Check if the question is a checkbox question
-            qtype_result = conn.execute(text("""
-                SELECT check_box FROM questions_18 WHERE question_id = :question_id
-            """), {"question_id": question_id})
-            qtype = qtype_result.mappings().first()
-            is_checkbox = qtype and qtype['check_box']
-
-            # Get all options_18 for this question (including OTHER)
-            options_result = conn.execute(text("""
-                SELECT id, option_text, option_code FROM options_18 WHERE question_id = :question_id ORDER BY option_code
-            """), {"question_id": question_id})
-            options_18 = options_result.mappings().all()
-            print(f"DEBUG: Found {len(options_18)} options_18 for question {question_id}")
-            print(f"DEBUG: Options: {options_18}")
+        async with request.app.state.engine.connect() as conn:
+            # Question type, options, vote counts and "Other" texts in one round trip
+            payload = (await conn.execute(SQL_QUESTION_RESULTS, {"question_id": question_id})).scalar()
+            is_checkbox = payload['check_box']
+
+            # All options_18 for this question (including OTHER)
+            options_18 = payload['options'] or []
             option_codes = [opt['option_code'] for opt in options_18]
             option_texts = {opt['option_code']: opt['option_text'] for opt in options_18}
-            print(f"DEBUG: Option codes: {option_codes}")
-            print(f"DEBUG: Option texts: {option_texts}")
 
+            # Checkbox counts come as weighted and anonymous rows, so a code can appear twice
             results_dict = {code: 0.0 for code in option_codes}
+            for row in payload['counts'] or []:
+                if row['option_code'] in results_dict:
+                    results_dict[row['option_code']] += row['count']
 
-            if is_checkbox:
-                # Weighted logic: for each user, split their vote among their selections
-                user_votes = conn.execute(text("""
-                    SELECT uuid, STRING_AGG(option_code, ',') as codes
-                    FROM checkbox_responses_18
-                    WHERE question_id = :question_id
-                    GROUP BY uuid
-                """), {"question_id": question_id}).mappings().all()
-                for user in user_votes:
-                    if not user['uuid'] or not user['codes']:
-                        continue
-                    codes = user['codes'].split(',')
-                    n = len(codes)
-                    if n == 0:
-                        continue
-                    weight = 1.0 / n
-                    for code in codes:
-                        if code in results_dict:
-                            results_dict[code] += weight
-                # For anonymous votes (no uuid), count as 1 per selection
-                anon_votes = conn.execute(text("""
-                    SELECT option_code, COUNT(*) as count
-                    FROM checkbox_responses_18
-                    WHERE question_id = :question_id AND (uuid IS NULL OR uuid = '')
-                    GROUP BY option_code
-                """), {"question_id": question_id}).mappings().all()
-                for row in anon_votes:
-                    if row['option_code'] in results_dict:
-                        results_dict[row['option_code']] += row['count']
-            else:
-                # Non-checkbox: count FROM responses_18 table
-                resp_counts = conn.execute(text("""
-                    SELECT option_code, COUNT(*) as count
-                    FROM responses_18
-                    WHERE question_id = :question_id
-                    GROUP BY option_code
-                """), {"question_id": question_id}).mappings().all()
-                for row in resp_counts:
-                    if row['option_code'] in results_dict:
-                        results_dict[row['option_code']] += row['count']
-
-            # Get "Other" responses_18 text for display
-            other_responses_result = conn.execute(text("""
-                SELECT other_text
-                FROM other_responses_18
-                WHERE question_id = :question_id
-                ORDER BY submitted_at DESC
-            """), {"question_id": question_id})
-            other_responses_18 = [row['other_text'] for row in other_responses_result.mappings().all()]
+            # "Other" responses_18 text for display, newest first
+            other_responses_18 = payload['other'] or []
 
             # Prepare results for frontend
             formatted_results = {"results": []}
-            logger.debug(f"Processing {len(option_codes)} options_18: {option_codes}")
-            logger.debug(f"Results dict: {results_dict}")
             for code in option_codes:
                 if code == 'OTHER':
                     # For "Other", use the count of other_responses_18 for non-checkbox, or weighted count for checkbox
@@ -529,7 +834,6 @@ async def get_question_results(question_id: str, request: Request):
                     else:
                         count = len(other_responses_18)
                     # Always include "Other" option, even with 0 count
-                    logger.debug(f"Adding OTHER option with count: {count}")
                     formatted_results["results"].append({
                         "text": option_texts.get('OTHER', 'Other'),  # Use actual option_text from database, fallback to 'Other'
                         "code": "OTHER",
@@ -538,14 +842,13 @@ async def get_question_results(question_id: str, request: Request):
                 else:
                     count = results_dict[code]
                     # Always include all options_18, even with 0 count
-                    logger.debug(f"Adding option {code} with count: {count}")
                     formatted_results["results"].append({
                         "text": option_texts[code],
                         "code": code,
                         "count": round(count, 2)  # Round to 2 decimal places
                     })
             formatted_results["custom_responses"] = other_responses_18
-            logger.debug(f"Formatted results being returned: {formatted_results}")
+            logger.debug("Formatted results being returned: %s", formatted_results)
             return formatted_results
     except Exception as e:
         logger.error(f"Error fetching results: {str(e)}")
@@ -555,7 +858,7 @@ async def get_question_results(question_id: str, request: Request):
 async def get_follow_up(request: FollowUpRequest):
     try:
         # Get session history
-        previous_responses = session_responses.get(request.session_id, [])
+        previous_responses = await app.state.sessions.get(request.session_id)
         
         # Here we would call OpenAI API to generate follow-ups
         # For now, return placeholder response
@@ -574,57 +877,22 @@ async def get_follow_up(request: FollowUpRequest):
 
 @app.get("/api/start-question/{category_id}")
 async def get_start_question(category_id: str, request: Request):
-    logger.debug(f"Getting start question for category: {category_id}")
+    logger.debug("Getting start question for category: %s", category_id)
     try:
-        with request.app.state.engine.connect() as conn:
+        async with request.app.state.engine.connect() as conn:
             if category_id == 'all':
-                query = text("""
-                    SELECT q.*, c.category_name
-                    FROM questions_18 q
-                    LEFT JOIN categories_18 c ON q.category_id = c.id
-                    WHERE q.is_start_question = TRUE
-                    ORDER BY RANDOM()
-                    LIMIT 1
-                """)
-                question_result = conn.execute(query)
-            else:
-                query = text("""
-                    SELECT q.*, c.category_name
-                    FROM questions_18 q
-                    LEFT JOIN categories_18 c ON q.category_id = c.id
-                    WHERE q.category_id = :category_id AND q.is_start_question = TRUE
-                    LIMIT 1
-                """)
-                question_result = conn.execute(query, {'category_id': int(category_id)})
-
-            question = question_result.mappings().first()
-            if not question:
-                raise HTTPException(status_code=404, detail="Start question not found")
-
-            options_result = conn.execute(text("""
-                SELECT id, option_text, option_code, response_message, companion_advice, next_question_id
-                FROM options_18
-                WHERE question_id = :question_id
-                ORDER BY option_code
-            """), {"question_id": question['question_id']})
-            options_18 = options_result.mappings().all()
+                # Pick a random start question in Python rather than sorting them all with ORDER BY RANDOM()
+                start_ids = await get_start_question_ids(conn)
+                question = await get_question(conn, random.choice(start_ids)) if start_ids else None
+                if not question:
+                    raise HTTPException(status_code=404, detail="Start question not found")
+                return question
 
-            return {
-                "id": question['id'],
-                "question_id": question['question_id'],
-                "text": question['question_text'],
-                "category": question['category_name'],
-                "category_id": str(question['category_id']),
-                "color_code": question['color_code'],
-                "options_18": [{
-                    "id": opt['id'],
-                    "text": opt['option_text'],
-                    "code": opt['option_code'],
-                    "response_message": opt['response_message'],
-                    "companion_advice": opt['companion_advice'],
-                    "next_question_id": opt['next_question_id']
-                } for opt in options_18]
-            }
+            # Pick the question in a CTE and join its options in the same round trip
+            rows = (await conn.execute(SQL_CATEGORY_START_QUESTION, {'category_id': int(category_id)})).mappings().all()
+            if not rows:
+                raise HTTPException(status_code=404, detail="Start question not found")
+            return build_question(rows)
     except HTTPException:
         raise
     except Exception as e:
@@ -634,57 +902,14 @@ async def get_start_question(category_id: str, request: Request):
 @app.get("/api/next-question/{question_id}/{option_code}")
 async def get_next_question(question_id: str, option_code: str, request: Request):
     try:
-        with request.app.state.engine.connect() as conn:
-            # Find the next_question_id from the options_18 table
-            next_question_id_result = conn.execute(text("""
-                SELECT next_question_id FROM options_18
-                WHERE question_id = :question_id AND option_code = :option_code
-            """), {"question_id": question_id, "option_code": option_code})
-            next_question_info = next_question_id_result.mappings().first()
-
-            if not next_question_info or not next_question_info['next_question_id']:
-                return {"next_question": None}
-
-            next_question_id = next_question_info['next_question_id']
-
-            # Fetch the full next question details
-            question_result = conn.execute(text("""
-                SELECT q.*, c.category_name
-                FROM questions_18 q
-                JOIN categories_18 c ON q.category_id = c.id
-                WHERE q.question_id = :next_question_id
-            """), {"next_question_id": next_question_id})
-            question = question_result.mappings().first()
-
-            if not question:
+        async with request.app.state.engine.connect() as conn:
+            # Follow the chosen option's next_question_id, both questions usually coming from the cache
+            current = await get_question(conn, question_id)
+            next_question_id = next((opt['next_question_id'] for opt in current['options_18']
+                                     if opt['code'] == option_code), None) if current else None
+            if not next_question_id:
                 return {"next_question": None}
-
-            options_result = conn.execute(text("""
-                SELECT id, option_text, option_code, response_message, companion_advice, next_question_id
-                FROM options_18
-                WHERE question_id = :question_id
-                ORDER BY option_code
-            """), {"question_id": question['question_id']})
-            options_18 = options_result.mappings().all()
-
-            return {
-                "next_question": {
-                    "id": question['id'],
-                    "question_id": question['question_id'],
-                    "text": question['question_text'],
-                    "category": question['category_name'],
-                    "category_id": str(question['category_id']),
-                    "color_code": question['color_code'],
-                    "options_18": [{
-                        "id": opt['id'],
-                        "text": opt['option_text'],
-                        "code": opt['option_code'],
-                        "response_message": opt['response_message'],
-                        "companion_advice": opt['companion_advice'],
-                        "next_question_id": opt['next_question_id']
-                    } for opt in options_18]
-                }
-            }
+            return {"next_question": await get_question(conn, next_question_id)}
     except Exception as e:
         logger.error(f"Error fetching next question: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -708,52 +933,14 @@ class CheckboxVote(BaseModel):
 @app.post("/api/other-response")
 async def submit_other_response(response: OtherResponse, request: Request):
     try:
-        with request.app.state.engine.begin() as conn:
+        async with request.app.state.engine.begin() as conn:
             # Handle user creation/validation if UUID is provided
             if response.uuid and response.year_of_birth:
-                # Check if user exists, create if not
-                user_result = conn.execute(text("""
-                    SELECT uuid FROM users_18 WHERE uuid = :uuid
-                """), {"uuid": response.uuid})
-                user = user_result.mappings().first()
-                
-                if not user:
-                    # Create new user with referral info if provided
-                    if response.referred_by:
-                        # Verify the referrer exists
-                        referrer_result = conn.execute(text("""
-                            SELECT uuid FROM users_18 WHERE uuid = :referrer_uuid
-                        """), {"referrer_uuid": response.referred_by})
-                        referrer = referrer_result.mappings().first()
-                        
-                        if referrer:
-                            conn.execute(text("""
-                                INSERT INTO users_18 (uuid, year_of_birth, referred_by)
-                                VALUES (:uuid, :year_of_birth, :referred_by)
-                            """), {
-                                "uuid": response.uuid, 
-                                "year_of_birth": response.year_of_birth,
-                                "referred_by": response.referred_by
-                            })
-                            logger.info(f"Created new user with UUID: {response.uuid} referred by: {response.referred_by}")
-                        else:
-                            # Referrer doesn't exist, create user without referral
-                            conn.execute(text("""
-                                INSERT INTO users_18 (uuid, year_of_birth)
-                                VALUES (:uuid, :year_of_birth)
-                            """), {"uuid": response.uuid, "year_of_birth": response.year_of_birth})
-                            logger.info(f"Created new user with UUID: {response.uuid} (invalid referrer: {response.referred_by})")
-                    else:
-                        # Create new user without referral
-                        conn.execute(text("""
-                            INSERT INTO users_18 (uuid, year_of_birth)
-                            VALUES (:uuid, :year_of_birth)
-                        """), {"uuid": response.uuid, "year_of_birth": response.year_of_birth})
-                        logger.info(f"Created new user with UUID: {response.uuid}")
+                await ensure_user(conn, response.uuid, response.year_of_birth, response.referred_by)
             
             # Insert the other response with UUID if provided
             if response.uuid:
-                conn.execute(
+                await conn.execute(
                     insert(other_responses_table).values(
                         question_id=response.question_id,
                         question_text=response.question_text,
@@ -762,7 +949,7 @@ async def submit_other_response(response: OtherResponse, request: Request):
                     )
                 )
             else:
-                conn.execute(
+                await conn.execute(
                     insert(other_responses_table).values(
                         question_id=response.question_id,
                         question_text=response.question_text,
@@ -777,82 +964,50 @@ async def submit_other_response(response: OtherResponse, request: Request):
 @app.post("/api/checkbox-vote")
 async def submit_checkbox_vote(vote: CheckboxVote, request: Request):
     try:
-        with request.app.state.engine.begin() as conn:
-            # Check for recent vote (configurable cooldown)
-            result = conn.execute(
-                text(f"""
-                    SELECT * FROM checkbox_responses_18
-                    WHERE uuid = :uuid
-                      AND question_id = :qid
-                      AND created_at > NOW() - INTERVAL '{QUESTION_COOLDOWN}'
-                """),
-                {"uuid": vote.uuid, "qid": vote.question_id}
-            ).fetchone()
-            if result:
+        async with request.app.state.engine.begin() as conn:
+            # Check for recent vote (configurable cooldown) and, if UUID and year of birth are
+            # provided, create the user in the same round trip
+            precheck = (await conn.execute(SQL_CHECKBOX_VOTE_PRECHECK, {
+                "uuid": vote.uuid,
+                "qid": vote.question_id,
+                "year_of_birth": vote.year_of_birth,
+                "referred_by": vote.referred_by,
+                "create_user": bool(vote.uuid and vote.year_of_birth)
+            })).mappings().first()
+            if precheck['blocked']:
                 return {
                     "status": "already_voted",
                     "message": f"You have already voted on this question. Please come back after {QUESTION_COOLDOWN} if you want to vote again for this question."
                 }
-            # Handle user creation/validation if UUID is provided
-            if vote.uuid and vote.year_of_birth:
-                # Check if user exists, create if not
-                user_result = conn.execute(text("""
-                    SELECT uuid FROM users_18 WHERE uuid = :uuid
-                """), {"uuid": vote.uuid})
-                user = user_result.mappings().first()
-                if not user:
-                    # Create new user with referral info if provided
-                    if vote.referred_by:
-                        # Verify the referrer exists
-                        referrer_result = conn.execute(text("""
-                            SELECT uuid FROM users_18 WHERE uuid = :referrer_uuid
-                        """), {"referrer_uuid": vote.referred_by})
-                        referrer = referrer_result.mappings().first()
-                        
-                        if referrer:
-                            conn.execute(text("""
-                                INSERT INTO users_18 (uuid, year_of_birth, referred_by)
-                                VALUES (:uuid, :year_of_birth, :referred_by)
-                            """), {
-                                "uuid": vote.uuid, 
-                                "year_of_birth": vote.year_of_birth,
-                                "referred_by": vote.referred_by
-                            })
-                            logger.info(f"Created new user with UUID: {vote.uuid} referred by: {vote.referred_by}")
-                        else:
-                            # Referrer doesn't exist, create user without referral
-                            conn.execute(text("""
-                                INSERT INTO users_18 (uuid, year_of_birth)
-                                VALUES (:uuid, :year_of_birth)
-                            """), {"uuid": vote.uuid, "year_of_birth": vote.year_of_birth})
-                            logger.info(f"Created new user with UUID: {vote.uuid} (invalid referrer: {vote.referred_by})")
-                    else:
-                        # Create new user without referral
-                        conn.execute(text("""
-                            INSERT INTO users_18 (uuid, year_of_birth)
-                            VALUES (:uuid, :year_of_birth)
-                        """), {"uuid": vote.uuid, "year_of_birth": vote.year_of_birth})
-                        logger.info(f"Created new user with UUID: {vote.uuid}")
-            # Insert new checkbox responses_18
-            for option_code in vote.option_codes:
-                option_result = conn.execute(text("""
-                    SELECT id FROM options_18 
-                    WHERE question_id = :question_id AND option_code = :option_code
-                """), {"question_id": vote.question_id, "option_code": option_code})
-                option = option_result.mappings().first()
-                if option:
-                    conn.execute(text("""
-                        INSERT INTO checkbox_responses_18 (question_id, option_id, uuid, option_code)
-                        VALUES (:question_id, :option_id, :uuid, :option_code)
-                    """), {
+            if precheck['user_created']:
+                logger.info(f"Created new user with UUID: {vote.uuid} (referred by: {precheck['referred_by']})")
+            # Insert new checkbox responses_18: one row per selected code, in the order given,
+            # with unknown codes skipped. With the question cached the option ids are known and
+            # go in as arrays in one INSERT; otherwise Postgres resolves them in a single
+            # INSERT ... SELECT FROM options_18.
+            codes = list(dict.fromkeys(vote.option_codes))
+            question = _question_cache.get(vote.question_id)
+            if question is None:
+                await conn.execute(SQL_RECORD_CHECKBOX_VOTE, {
+                    "question_id": vote.question_id,
+                    "uuid": vote.uuid,
+                    "option_codes": codes
+                })
+            else:
+                option_ids = {}
+                for opt in question['options_18']:
+                    option_ids[opt['code']] = min(opt['id'], option_ids.get(opt['code'], opt['id']))
+                codes = [option_code for option_code in codes if option_code in option_ids]
+                if codes:
+                    await conn.execute(SQL_RECORD_CHECKBOX_OPTIONS, {
                         "question_id": vote.question_id,
-                        "option_id": option['id'],
                         "uuid": vote.uuid,
-                        "option_code": option_code
+                        "option_ids": [option_ids[option_code] for option_code in codes],
+                        "option_codes": codes
                     })
             # If 'OTHER' is selected and other_text is provided, save to other_responses_18
             if 'OTHER' in vote.option_codes and hasattr(vote, 'other_text') and vote.other_text and vote.other_text.strip():
-                conn.execute(
+                await conn.execute(
                     insert(other_responses_table).values(
                         question_id=vote.question_id,
                         question_text="",  # Optionally fetch question text if needed
@@ -860,13 +1015,9 @@ async def submit_checkbox_vote(vote: CheckboxVote, request: Request):
                         uuid=vote.uuid
                     )
                 )
-            # After recording the vote, check if all questions_18 in the block are answered
-            qinfo = conn.execute(text("""
-                SELECT category_id, block FROM questions_18 WHERE question_id = :qid
-            """), {"qid": vote.question_id}).mappings().first()
-            if vote.uuid and qinfo and qinfo['block'] is not None:
-                if all_block_questions_answered(conn, vote.uuid, qinfo['category_id'], qinfo['block']):
-                    await mark_block_completed(conn, vote.uuid, qinfo['category_id'], qinfo['block'])
+            # After recording the vote, mark the block completed if all its questions_18 are answered
+            if vote.uuid:
+                await mark_block_completed_if_answered(conn, vote.uuid, vote.question_id)
             return {"status": "success"}
     except Exception as e:
         logger.error(f"Error submitting checkbox vote: {str(e)}")
@@ -875,8 +1026,8 @@ async def submit_checkbox_vote(vote: CheckboxVote, request: Request):
 @app.get("/api/db-status")
 async def db_status(request: Request):
     try:
-        with request.app.state.engine.connect() as conn:
-            result = conn.execute(text("SELECT COUNT(*) FROM categories_18"))
+        async with request.app.state.engine.connect() as conn:
+            result = await conn.execute(SQL_CATEGORY_COUNT)
             count = result.scalar_one()
             return {"status": "ok", "category_count": count}
     except Exception as e:
@@ -891,41 +1042,52 @@ async def health():
 async def api_health():
     return {"status": "ok", "message": "API is running"}
 
+# Endpoint: Drop cached content after editing categories/questions/options
+@app.post("/api/admin/cache/clear")
+async def clear_content_caches(request: Request, x_admin_token: str = Header(None)):
+    """
+    Clear the Redis response cache and this worker's in-process content caches.
+    Other workers refresh theirs within QUESTIONS_CACHE_TTL. Disabled unless
+    ADMIN_TOKEN is set; callers send it in the X-Admin-Token header.
+    """
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    _question_cache.clear()
+    _blocks_cache.clear()
+    _start_question_ids["expires_at"] = 0.0
+    redis_client = request.app.state.redis
+    if redis_client is not None:
+        keys = [CATEGORIES_CACHE_KEY] + [key async for key in redis_client.scan_iter(match="qs:*")]
+        await redis_client.delete(*keys)
+    return {"status": "cleared"}
+
+async def ensure_user(conn, uuid, year_of_birth, referred_by):
+    """Create the user on first submission in one upsert; an unknown referrer is stored as NULL."""
+    created = (await conn.execute(SQL_CREATE_USER, {
+        "uuid": uuid,
+        "year_of_birth": year_of_birth,
+        "referred_by": referred_by
+    })).mappings().first()
+    if created:
+        logger.info(f"Created new user with UUID: {uuid} (referred by: {created['referred_by']})")
+
 # Helper: Mark block as completed for a user
-async def mark_block_completed(conn, uuid, category_id, block):
-    conn.execute(text("""
-        INSERT INTO user_block_progress_18 (uuid, category_id, block, completed_at)
-        VALUES (:uuid, :category_id, :block, NOW())
-        ON CONFLICT (uuid, category_id, block) DO UPDATE SET completed_at = NOW()
-    """), {"uuid": uuid, "category_id": category_id, "block": block})
+async def mark_block_completed_if_answered(conn, uuid, question_id):
+    """
+    Mark the block containing question_id complete for this user once every
+    question in it has a response (checkbox questions in checkbox_responses_18),
+    in a single statement.
+    """
+    await conn.execute(SQL_MARK_BLOCK_COMPLETED_IF_ANSWERED, {"uuid": uuid, "question_id": question_id})
 
 # Endpoint: Get all blocks_18 for a category
 @app.get("/api/blocks/{category_id}")
 async def get_blocks_for_category(category_id: int, request: Request):
     try:
-        with request.app.state.engine.connect() as conn:
-            # Get all blocks_18 for this category from the blocks_18 table
-            blocks_result = conn.execute(text("""
-                SELECT id, category_id, block_number, block_text, version, uuid
-                FROM blocks_18
-                WHERE category_id = :category_id
-                ORDER BY block_number
-            """), {"category_id": category_id})
-            blocks_18 = [dict(row) for row in blocks_result.mappings().all()]
+        async with request.app.state.engine.connect() as conn:
+            blocks_18 = await get_blocks(conn, category_id)
             if not blocks_18:
-                # Fallback: if no blocks_18 in blocks_18 table, get FROM questions_18 table
-                fallback_result = conn.execute(text("""
-                    SELECT DISTINCT block as block_number, 
-                           'Block ' || block as block_text,
-                           :category_id as category_id
-                    FROM questions_18
-                    WHERE category_id = :category_id AND block IS NOT NULL
-                    ORDER BY block
-                """), {"category_id": category_id})
-                fallback_blocks = [dict(row) for row in fallback_result.mappings().all()]
-                if not fallback_blocks:
-                    raise HTTPException(status_code=404, detail="No blocks_18 found for this category")
-                return {"blocks_18": fallback_blocks}
+                raise HTTPException(status_code=404, detail="No blocks_18 found for this category")
             return {"blocks_18": blocks_18}
     except Exception as e:
         logger.error(f"Error in get_blocks_for_category: {str(e)}")
@@ -935,80 +1097,43 @@ async def get_blocks_for_category(category_id: int, request: Request):
 @app.get("/api/next-block/{category_id}")
 async def get_next_block(category_id: int, uuid: str, request: Request):
     try:
-        with request.app.state.engine.connect() as conn:
-            # Get all blocks_18 for this category
-            blocks_result = conn.execute(text("""
-                SELECT DISTINCT block FROM questions_18
-                WHERE category_id = :category_id
-                ORDER BY block
-            """), {"category_id": category_id})
-            all_blocks = [row['block'] for row in blocks_result.mappings().all() if row['block'] is not None]
-            if not all_blocks:
+        async with request.app.state.engine.connect() as conn:
+            # First block of the category not completed within the cooldown, in one query
+            row = (await conn.execute(SQL_NEXT_BLOCK, {"uuid": uuid, "category_id": category_id})).mappings().first()
+            if not row['has_blocks']:
                 raise HTTPException(status_code=404, detail="No blocks_18 found for this category")
-            # Get blocks_18 completed in last configurable cooldown period
-            cooldown_result = conn.execute(text(f"""
-                SELECT block FROM user_block_progress_18
-                WHERE uuid = :uuid AND category_id = :category_id
-                  AND completed_at > NOW() - INTERVAL '{BLOCK_COOLDOWN}'
-            """), {"uuid": uuid, "category_id": category_id})
-            cooldown_blocks = set(row['block'] for row in cooldown_result.mappings().all())
-            # Find the first block not in cooldown
-            for block in all_blocks:
-                if block not in cooldown_blocks:
-                    return {"block": block}
+            if row['block'] is not None:
+                return {"block": row['block']}
             return {"block": None, "message": "No available blocks_18. Come back later!"}
     except Exception as e:
         logger.error(f"Error in get_next_block: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Unmatched /api/ paths 404 in the router instead of reaching the frontend
+@app.get("/api/{full_path:path}", include_in_schema=False)
+async def api_not_found(full_path: str):
+    return JSONResponse({"detail": "API endpoint not found"}, status_code=404)
+
 # Serve static files for the frontend - this must be at the end
+class SPAStaticFiles(StaticFiles):
+    """StaticFiles for the built SPA: unknown paths get index.html so client-side routes load."""
+
+    async def get_response(self, path, scope):
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as e:
+            # Missing build assets stay 404s rather than getting the HTML page
+            if e.status_code != 404 or path.startswith("assets/"):
+                raise
+            return await super().get_response("index.html", scope)
+
 frontend_dir = Path(__file__).resolve().parent.parent / "frontend/dist"
 
 if frontend_dir.exists():
-    app.mount("/assets", StaticFiles(directory=frontend_dir / "assets"), name="assets")
-
-    @app.get("/{full_path:path}")
-    async def serve_frontend(full_path: str):
-        # Skip API routes
-        if full_path.startswith("api/"):
-            return JSONResponse({"detail": "API endpoint not found"}, status_code=404)
-        frontend_dir = Path(__file__).parent.parent / "frontend" / "dist"
-        index_file = frontend_dir / "index.html"
-        file_path = frontend_dir / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(str(file_path))
-        elif index_file.exists():
-            return FileResponse(str(index_file))
-        else:
-            logger.warning(f"Frontend dist directory not found at {frontend_dir}")
-            return JSONResponse({"detail": "Frontend not built"}, status_code=404)
+    app.mount("/", SPAStaticFiles(directory=frontend_dir, html=True), name="frontend")
 else:
     logger.warning(f"Frontend dist directory not found at {frontend_dir}")
 
-def all_block_questions_answered(conn, uuid, category_id, block):
-    # Get all question_ids for this block
-    qids_result = conn.execute(text("""
-        SELECT question_id, check_box FROM questions_18 WHERE category_id = :category_id AND block = :block
-    """), {"category_id": category_id, "block": block})
-    qid_types = [(row['question_id'], row['check_box']) for row in qids_result.mappings().all()]
-    if not qid_types:
-        return False
-    answered = set()
-    for qid, is_checkbox in qid_types:
-        if is_checkbox:
-            resp_result = conn.execute(text("""
-                SELECT 1 FROM checkbox_responses_18 WHERE uuid = :uuid AND question_id = :qid LIMIT 1
-            """), {"uuid": uuid, "qid": qid})
-            if resp_result.fetchone():
-                answered.add(qid)
-        else:
-            resp_result = conn.execute(text("""
-                SELECT 1 FROM responses_18 WHERE uuid = :uuid AND question_id = :qid LIMIT 1
-            """), {"uuid": uuid, "qid": qid})
-            if resp_result.fetchone():
-                answered.add(qid)
-    return set(qid for qid, _ in qid_types) == answered
-
 if __name__ == "__main__":
     uvicorn.run(app, host=HOST, port=PORT)
 
@@ -0,0 +1,15 @@
+-- Composite indexes for the voting and results queries on the _18 response tables
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so apply this
+-- file with psql in autocommit mode (psql "$DATABASE_URL" -f ...), not via engine.begin()
+
+-- submit_vote cooldown check: uuid + question_id, most recent created_at first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resp_uuid_qid_created
+    ON responses_18 (uuid, question_id, created_at DESC);
+
+-- get_question_results vote counts grouped by option_code
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resp_qid_optcode
+    ON responses_18 (question_id, option_code);
+
+-- Weighted checkbox results, partitioned by voter within a question
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cbresp_qid_uuid
+    ON checkbox_responses_18 (question_id, uuid);
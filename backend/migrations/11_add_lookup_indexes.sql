@@ -0,0 +1,16 @@
+-- Composite indexes for the checkbox cooldown, option lookups and next-block queries
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so apply this
+-- file with psql in autocommit mode (psql "$DATABASE_URL" -f ...), not via engine.begin()
+-- responses_18 (uuid, question_id) is already covered by idx_resp_uuid_qid_created (10)
+
+-- submit_checkbox_vote cooldown check and block completion probes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cbresp_uuid_qid_created
+    ON checkbox_responses_18 (uuid, question_id, created_at DESC);
+
+-- Options of a question by code (vote and checkbox inserts, question payloads)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_options_qid_code
+    ON options_18 (question_id, option_code);
+
+-- get_next_block: blocks a user completed in a category within the cooldown
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ubp_uuid_cat_completed
+    ON user_block_progress_18 (uuid, category_id, completed_at DESC);
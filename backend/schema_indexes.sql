@@ -0,0 +1,25 @@
+-- Foreign keys and indexes for the setup tables (run after the data import)
+-- Constraints are dropped first so the script can be re-run safely
+ALTER TABLE questions
+    DROP CONSTRAINT IF EXISTS questions_category_id_fkey,
+    ADD CONSTRAINT questions_category_id_fkey
+        FOREIGN KEY (category_id) REFERENCES categories(id);
+
+ALTER TABLE options
+    DROP CONSTRAINT IF EXISTS options_question_id_fkey,
+    ADD CONSTRAINT options_question_id_fkey
+        FOREIGN KEY (question_id) REFERENCES questions(question_id),
+    DROP CONSTRAINT IF EXISTS options_next_question_id_fkey,
+    ADD CONSTRAINT options_next_question_id_fkey
+        FOREIGN KEY (next_question_id) REFERENCES questions(question_id);
+
+ALTER TABLE blocks
+    DROP CONSTRAINT IF EXISTS blocks_category_id_fkey,
+    ADD CONSTRAINT blocks_category_id_fkey
+        FOREIGN KEY (category_id) REFERENCES categories(id);
+
+-- Indexes for better performance
+CREATE INDEX IF NOT EXISTS idx_questions_category_id ON questions(category_id);
+CREATE INDEX IF NOT EXISTS idx_questions_question_id ON questions(question_id);
+CREATE INDEX IF NOT EXISTS idx_options_question_id ON options(question_id);
+CREATE INDEX IF NOT EXISTS idx_blocks_category_id ON blocks(category_id);
@@ -1,4 +1,6 @@
 -- Setup tables (can be updated frequently without losing user data)
+-- Foreign keys and secondary indexes live in schema_indexes.sql and are
+-- applied after the CSV data has been loaded.
 -- Categories table
 CREATE TABLE IF NOT EXISTS categories (
     id SERIAL PRIMARY KEY,
@@ -16,15 +18,14 @@ CREATE TABLE IF NOT EXISTS questions (
     question_id TEXT NOT NULL UNIQUE,
     question_number INTEGER NOT NULL,
     question_text TEXT NOT NULL,
-    category_id INTEGER REFERENCES categories(id),
+    category_id INTEGER,
     is_start_question BOOLEAN DEFAULT FALSE,
     parent_question_id TEXT,
     check_box BOOLEAN DEFAULT FALSE,
     block_number INTEGER,
     color_code TEXT,
     block_id INTEGER,
-    version VARCHAR(50) DEFAULT '1.0',
-    FOREIGN KEY (category_id) REFERENCES categories(id)
+    version VARCHAR(50) DEFAULT '1.0'
 );
 
 -- Options table
@@ -38,9 +39,7 @@ CREATE TABLE IF NOT EXISTS options (
     companion_advice TEXT,
     tone_tag TEXT,
     version VARCHAR(50) DEFAULT '1.0',
-    uuid VARCHAR(255),
-    FOREIGN KEY (question_id) REFERENCES questions(question_id),
-    FOREIGN KEY (next_question_id) REFERENCES questions(question_id)
+    uuid VARCHAR(255)
 );
 
 -- Blocks table
@@ -50,12 +49,5 @@ CREATE TABLE IF NOT EXISTS blocks (
     block_number INTEGER NOT NULL,
     block_text TEXT NOT NULL,
     version VARCHAR(50) DEFAULT '1.0',
-    uuid VARCHAR(255),
-    FOREIGN KEY (category_id) REFERENCES categories(id)
+    uuid VARCHAR(255)
 );
-
--- Indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_questions_category_id ON questions(category_id);
-CREATE INDEX IF NOT EXISTS idx_questions_question_id ON questions(question_id);
-CREATE INDEX IF NOT EXISTS idx_options_question_id ON options(question_id);
-CREATE INDEX IF NOT EXISTS idx_blocks_category_id ON blocks(category_id); 
\ No newline at end of file
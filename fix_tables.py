@@ -23,31 +23,20 @@ table_mappings = {
     'user_block_progress': 'user_block_progress_18'
 }
 
-# Replace table references in SQL queries
-# This regex looks for FROM/JOIN followed by table names that don't end with _18
-for old_table, new_table in table_mappings.items():
-    # Replace FROM table_name
-    content = re.sub(
-        rf'\bFROM\s+{old_table}\b',
-        f'FROM {new_table}',
-        content,
-        flags=re.IGNORECASE
-    )
-    
-    # Replace JOIN table_name
-    content = re.sub(
-        rf'\bJOIN\s+{old_table}\b',
-        f'JOIN {new_table}',
-        content,
-        flags=re.IGNORECASE
-    )
-    
-    # Replace table_name in other contexts (like table_name.field)
-    content = re.sub(
-        rf'\b{old_table}\b(?!_18)',
-        new_table,
-        content
-    )
+# Replace table references in a single pass over the file. FROM/JOIN followed by a
+# table name is matched case-insensitively and normalized to "FROM table_18";
+# any other bare table name (like table_name.field) is matched as written.
+# Longer names come first so checkbox_responses wins over responses.
+names = '|'.join(re.escape(name) for name in sorted(table_mappings, key=len, reverse=True))
+table_pattern = re.compile(rf'\b(?:(?i:(FROM|JOIN)\s+({names}))|({names}))\b(?!_18)')
+
+def replace_table(match):
+    keyword, sql_table, bare_table = match.groups()
+    if keyword:
+        return f'{keyword.upper()} {table_mappings[sql_table.lower()]}'
+    return table_mappings[bare_table]
+
+content = table_pattern.sub(replace_table, content)
 
 # Write the updated content back
 with open('backend/main.py', 'w') as f: